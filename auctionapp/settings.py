@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -54,10 +56,73 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'mainapp.ratelimit.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+# Multi-node deployments must point every host at the same cache, e.g.
+# DJANGO_CACHE_BACKEND=django.core.cache.backends.memcached.MemcachedCache
+# DJANGO_CACHE_LOCATION=10.0.0.5:11211
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', ''),
+    }
+}
+
+
+# Multi-node deployment
+# With AUCTION_MULTI_NODE=1 sessions are read through the shared cache (and kept
+# in the database so a cache restart does not log everyone out), and auctions are
+# closed by `manage.py run_expiry_worker` (one leader across all hosts) instead
+# of on every request. DJANGO_FILE_STORAGE selects a shared media storage class;
+# set AUCTION_SHARED_MEDIA_ROOT=1 instead if MEDIA_ROOT is a shared mount (NFS/EFS).
+
+MULTI_NODE = os.getenv('AUCTION_MULTI_NODE') == '1'
+
+DEFAULT_FILE_STORAGE = os.getenv('DJANGO_FILE_STORAGE', 'django.core.files.storage.FileSystemStorage')
+
+SHARED_MEDIA_ROOT = os.getenv('AUCTION_SHARED_MEDIA_ROOT') == '1'
+
+# Cache backends whose contents are not visible to other hosts (or not kept at all).
+NODE_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+if MULTI_NODE:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    if CACHES['default']['BACKEND'] in NODE_LOCAL_CACHE_BACKENDS:
+        raise ImproperlyConfigured("AUCTION_MULTI_NODE needs a shared cache, set DJANGO_CACHE_BACKEND and DJANGO_CACHE_LOCATION.")
+    if DEFAULT_FILE_STORAGE == 'django.core.files.storage.FileSystemStorage' and not SHARED_MEDIA_ROOT:
+        raise ImproperlyConfigured("AUCTION_MULTI_NODE needs shared media storage, set DJANGO_FILE_STORAGE or, if MEDIA_ROOT is a shared mount, AUCTION_SHARED_MEDIA_ROOT=1.")
+
+AUCTION_EXPIRY_IN_REQUEST = not MULTI_NODE
+
+
+# Rate limiting
+# Policies are keyed by URL name. 'rate' requests are allowed per 'period' seconds
+# per IP and, when logged in, per user; 'ipRate' overrides the per IP rate. 'params'
+# restricts the policy to requests carrying one of the given GET parameters.
+
+RATELIMIT_ENABLED = True
+RATELIMIT_CACHE = 'default'
+# Number of reverse proxies in front of gunicorn that append to X-Forwarded-For.
+# 0 uses REMOTE_ADDR; never set it higher than the real number of proxies.
+RATELIMIT_TRUSTED_PROXIES = int(os.getenv('RATELIMIT_TRUSTED_PROXIES', '0'))
+RATELIMIT_POLICIES = {
+    'mainapp:index': {'methods': ['GET'], 'params': ['searchvalue'], 'rate': 30, 'period': 60},
+    'mainapp:itempage': {'methods': ['PUT'], 'rate': 20, 'ipRate': 60, 'period': 60},
+    'mainapp:login': {'methods': ['POST'], 'rate': 10, 'period': 60},
+    'mainapp:signup': {'methods': ['POST'], 'rate': 5, 'period': 60},
+}
+
 ROOT_URLCONF = 'auctionapp.urls'
 
 TEMPLATES = [
@@ -85,7 +150,7 @@ WSGI_APPLICATION = 'auctionapp.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'NAME': os.getenv('DATABASE_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
         'USER': 'root',
         'PASSWORD': os.getenv("DATABASE_PASSWORD"),
         "HOST": os.getenv("DATABASE_SERVICE_NAME"),
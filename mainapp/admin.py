@@ -1,6 +1,107 @@
+from datetime import timedelta
+
 from django.contrib import admin
-from .models import CustomerProfile, Item
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import analytics
+from .models import CustomerProfile, Item, ItemOutcome, SellerDailyStats, HourlyBidStats
+
+class EstimatedCountPaginator(Paginator):
+	"""
+	On PostgreSQL, unfiltered changelists use the planner's row estimate instead of
+	COUNT(*) once a table is larger than ESTIMATE_THRESHOLD rows.
+	"""
+	ESTIMATE_THRESHOLD = 100000
+
+	@cached_property
+	def count(self):
+		query = getattr(self.object_list, "query", None)
+		if query is not None and not query.where and connection.vendor == "postgresql":
+			with connection.cursor() as cursor:
+				cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [self.object_list.model._meta.db_table])
+				row = cursor.fetchone()
+			if row and row[0] > self.ESTIMATE_THRESHOLD:
+				return row[0]
+		return super().count
+
+class LargeTableAdmin(admin.ModelAdmin):
+	paginator = EstimatedCountPaginator
+	show_full_result_count = False
+	list_per_page = 50
+
+@admin.register(Item)
+class ItemAdmin(LargeTableAdmin):
+	list_display = ("id", "title", "seller", "buyer", "price", "bidCount", "expiredate", "status")
+	list_select_related = ("seller", "buyer")
+	list_filter = ("status", "expiredate")
+	raw_id_fields = ("seller", "buyer")
+	readonly_fields = ("bidders",)
+	actions = ("closeItems", "extendItems", "cancelItems")
+
+	def bidCount(self, item):
+		return analytics.countBids(item.bidders)
+	bidCount.short_description = "Bids"
+
+	def closeOpen(self, queryset, cancelled=False, **changes):
+		"""Close the open items in queryset in one update and record only their outcomes."""
+		closed = 0
+		ids = list(queryset.filter(status=False).values_list("pk", flat=True))
+		with transaction.atomic():
+			for start in range(0, len(ids), analytics.BATCH_SIZE):
+				closed += Item.objects.filter(pk__in=ids[start:start + analytics.BATCH_SIZE], status=False).update(status=True, expiredate=timezone.now(), **changes)
+			analytics.recordClosedIds(ids, cancelled)
+		return closed
+
+	def closeItems(self, request, queryset):
+		self.message_user(request, "Closed %d auctions." % self.closeOpen(queryset))
+	closeItems.short_description = "Close selected auctions now"
+
+	def extendItems(self, request, queryset):
+		extended = queryset.filter(status=False).update(expiredate=F("expiredate") + timedelta(days=1))
+		self.message_user(request, "Extended %d auctions by one day." % extended)
+	extendItems.short_description = "Extend selected auctions by one day"
+
+	def cancelItems(self, request, queryset):
+		#A cancelled auction is closed without a winner and does not count as a market outcome.
+		self.message_user(request, "Cancelled %d auctions." % self.closeOpen(queryset, cancelled=True, buyer=F("seller")))
+	cancelItems.short_description = "Cancel selected auctions"
+
+@admin.register(CustomerProfile)
+class CustomerProfileAdmin(LargeTableAdmin):
+	list_display = ("id", "userid", "email", "birthDate")
+	list_select_related = ("userid",)
+	raw_id_fields = ("userid",)
+	search_fields = ("=email",)
+
+class RollupAdmin(LargeTableAdmin):
+	"""Rollups are derived from Item by mainapp.analytics and must not be edited by hand."""
+
+	def has_add_permission(self, request):
+		return False
+
+	def has_change_permission(self, request, obj=None):
+		return False
+
+	def has_delete_permission(self, request, obj=None):
+		return False
+
+@admin.register(ItemOutcome)
+class ItemOutcomeAdmin(RollupAdmin):
+	list_display = ("item", "seller", "closedAt", "sold", "cancelled", "finalPrice", "bidCount")
+	list_select_related = ("item", "seller")
+	list_filter = ("sold", "cancelled")
+	raw_id_fields = ("item", "seller")
+
+@admin.register(SellerDailyStats)
+class SellerDailyStatsAdmin(RollupAdmin):
+	list_display = ("seller", "day", "itemsListed", "bids", "itemsClosed", "itemsSold", "revenue")
+	list_select_related = ("seller",)
+	raw_id_fields = ("seller",)
 
-# Register your models here.
-admin.site.register(CustomerProfile)
-admin.site.register(Item)
\ No newline at end of file
+@admin.register(HourlyBidStats)
+class HourlyBidStatsAdmin(RollupAdmin):
+	list_display = ("hour", "bids")
@@ -0,0 +1,124 @@
+"""
+Rollup tables for seller and marketplace reporting.
+
+The bid, listing and close paths call the record* functions so reports never
+have to scan Item or parse the bidders string. rebuildOutcomes() is the batch
+job that backfills the close side of the rollups from Item.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import HourlyBidStats, Item, ItemOutcome, SellerDailyStats
+
+#Keeps IN (...) lists under SQLite's variable limit.
+BATCH_SIZE = 500
+
+def bump(model, lookup, **increments):
+	"""Atomically add the given increments to the row identified by lookup, creating it if needed."""
+	changes = {field: F(field) + value for field, value in increments.items()}
+	if model.objects.filter(**lookup).update(**changes):
+		return
+	try:
+		with transaction.atomic():
+			model.objects.create(**lookup, **increments)
+	except IntegrityError:
+		# Another request created the row first.
+		model.objects.filter(**lookup).update(**changes)
+
+def countBids(bidders):
+	return bidders.count(",")
+
+def isSold(item):
+	return item.buyer_id != item.seller_id
+
+def recordListing(item, when=None):
+	when = when or timezone.now()
+	bump(SellerDailyStats, {"seller_id": item.seller_id, "day": timezone.localdate(when)}, itemsListed=1)
+
+def recordBid(item, when=None):
+	when = when or timezone.now()
+	bump(SellerDailyStats, {"seller_id": item.seller_id, "day": timezone.localdate(when)}, bids=1)
+	bump(HourlyBidStats, {"hour": when.replace(minute=0, second=0, microsecond=0)}, bids=1)
+
+def recordOutcomes(items, cancelled=False):
+	"""
+	Store the final outcomes of closed items and add them to the daily rollups, all in
+	one transaction. Cancelled items get an outcome, so the batch job leaves them alone,
+	but are not market results and stay out of the rollups. Items that already have an
+	outcome are skipped. Raises IntegrityError if another process records one of the
+	items at the same time. Returns the number recorded.
+	"""
+	items = list(items)
+	recorded = 0
+	with transaction.atomic():
+		totals = defaultdict(lambda: {"itemsClosed": 0, "itemsSold": 0, "revenue": Decimal("0")})
+		for start in range(0, len(items), BATCH_SIZE):
+			batch = items[start:start + BATCH_SIZE]
+			done = set(ItemOutcome.objects.filter(item_id__in=[item.pk for item in batch]).values_list("item_id", flat=True))
+			batch = [item for item in batch if item.pk not in done]
+			ItemOutcome.objects.bulk_create([ItemOutcome(item=item, seller_id=item.seller_id, closedAt=item.expiredate, sold=isSold(item) and not cancelled, finalPrice=None if cancelled else item.price, bidCount=countBids(item.bidders), cancelled=cancelled) for item in batch])
+			recorded += len(batch)
+			if cancelled:
+				continue
+			for item in batch:
+				day = totals[(item.seller_id, timezone.localdate(item.expiredate))]
+				day["itemsClosed"] += 1
+				if isSold(item):
+					day["itemsSold"] += 1
+					day["revenue"] += item.price or 0
+		for (sellerId, day), increments in totals.items():
+			bump(SellerDailyStats, {"seller_id": sellerId, "day": day}, **increments)
+	return recorded
+
+def recordClose(item):
+	"""Store the final outcome of item. Safe to call more than once per item."""
+	try:
+		return recordOutcomes([item])
+	except IntegrityError:
+		# Recorded concurrently by another process.
+		return 0
+
+def recordClosedIds(ids, cancelled=False):
+	"""Record outcomes for the closed items with the given primary keys."""
+	recorded = 0
+	ids = list(ids)
+	for start in range(0, len(ids), BATCH_SIZE):
+		items = Item.objects.filter(pk__in=ids[start:start + BATCH_SIZE], status=True).only("id", "seller_id", "buyer_id", "expiredate", "price", "bidders")
+		recorded += recordOutcomes(items, cancelled)
+	return recorded
+
+def rebuildOutcomes():
+	"""Record outcomes for closed items that have none yet. Returns the number recorded."""
+	return recordClosedIds(Item.objects.filter(status=True, itemoutcome__isnull=True).values_list("pk", flat=True))
+
+def sellerSummary(seller, since=None):
+	"""Totals for one seller, read from SellerDailyStats only."""
+	rows = SellerDailyStats.objects.filter(seller=seller)
+	if since:
+		rows = rows.filter(day__gte=since)
+	totals = rows.aggregate(itemsListed=Sum("itemsListed"), bids=Sum("bids"), itemsClosed=Sum("itemsClosed"), itemsSold=Sum("itemsSold"), revenue=Sum("revenue"))
+	for key in totals:
+		totals[key] = totals[key] or 0
+	totals["sellThroughRate"] = totals["itemsSold"] / totals["itemsClosed"] if totals["itemsClosed"] else 0
+	totals["averageFinalPrice"] = totals["revenue"] / totals["itemsSold"] if totals["itemsSold"] else 0
+	return totals
+
+def allSellerTotals(since=None):
+	"""Marketplace wide per seller totals in one grouped query over SellerDailyStats."""
+	rows = SellerDailyStats.objects.all()
+	if since:
+		rows = rows.filter(day__gte=since)
+	return rows.values("seller_id").annotate(bids=Sum("bids"), itemsClosed=Sum("itemsClosed"), itemsSold=Sum("itemsSold"), revenue=Sum("revenue"))
+
+def sellerDailyRows(seller, since=None):
+	rows = SellerDailyStats.objects.filter(seller=seller).order_by("-day")
+	if since:
+		rows = rows.filter(day__gte=since)
+	return rows
+
+def bidsPerHour(since):
+	return HourlyBidStats.objects.filter(hour__gte=since).order_by("hour")
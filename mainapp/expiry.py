@@ -0,0 +1,18 @@
+from django.db import transaction
+from django.utils import timezone
+
+from . import analytics
+from .models import Item
+
+def closeExpiredItems():
+	"""Close open auctions past their expiry date. Returns the number closed."""
+	closed = 0
+	for pk in Item.objects.filter(status=False, expiredate__lt=timezone.now()).values_list("pk", flat=True):
+		#Only the caller that actually closes the item records its outcome, read
+		#after the update so a bid that landed in between is included. Closing and
+		#recording commit together, so a failure leaves the item open for the next pass.
+		with transaction.atomic():
+			if Item.objects.filter(id=pk, status=False).update(status=True):
+				analytics.recordClose(Item.objects.get(pk=pk))
+				closed += 1
+	return closed
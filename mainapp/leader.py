@@ -0,0 +1,38 @@
+"""
+Leader election through a lease row in WorkerLock.
+
+Every node runs the same worker, but only the node holding the lease does the
+work. The holder renews the lease on each pass; if it dies, the lease expires
+and another node takes over. Works on any database backend.
+"""
+import os
+import socket
+import uuid
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import WorkerLock
+
+def nodeIdentity():
+	return "%s:%d:%s" % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+
+def acquireLock(name, owner, ttl):
+	"""Take or renew the lease called name for ttl seconds. Returns True if owner holds it."""
+	now = timezone.now()
+	expiresAt = now + timedelta(seconds=ttl)
+	taken = WorkerLock.objects.filter(Q(owner=owner) | Q(expiresAt__lt=now), name=name).update(owner=owner, expiresAt=expiresAt)
+	if taken:
+		return True
+	try:
+		with transaction.atomic():
+			WorkerLock.objects.create(name=name, owner=owner, expiresAt=expiresAt)
+	except IntegrityError:
+		# The row exists and somebody else holds an unexpired lease.
+		return False
+	return True
+
+def releaseLock(name, owner):
+	WorkerLock.objects.filter(name=name, owner=owner).delete()
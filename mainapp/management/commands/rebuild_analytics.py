@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from mainapp import analytics
+
+class Command(BaseCommand):
+	help = "Record outcomes for closed auctions missing from the analytics rollups."
+
+	def handle(self, *args, **options):
+		recorded = analytics.rebuildOutcomes()
+		self.stdout.write("Recorded %d item outcomes." % recorded)
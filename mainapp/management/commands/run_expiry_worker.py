@@ -0,0 +1,48 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from mainapp import leader
+from mainapp.expiry import closeExpiredItems
+
+logger = logging.getLogger(__name__)
+
+LOCK_NAME = "expiry-worker"
+
+class Command(BaseCommand):
+	help = "Close expired auctions. Safe to run on every node: only the lease holder does any work."
+
+	def add_arguments(self, parser):
+		parser.add_argument("--interval", type=float, default=15, help="Seconds between passes.")
+		parser.add_argument("--ttl", type=int, default=60, help="Seconds before another node may take over the lease.")
+		parser.add_argument("--once", action="store_true", help="Run a single pass and exit, keeping the lease until it expires so that runs started together on other nodes (e.g. from cron) stay idle.")
+
+	def handle(self, *args, **options):
+		owner = leader.nodeIdentity()
+		if options["once"]:
+			self.runPass(owner, options)
+			return
+		try:
+			while True:
+				self.runPass(owner, options)
+				time.sleep(options["interval"])
+		finally:
+			leader.releaseLock(LOCK_NAME, owner)
+
+	def runPass(self, owner, options):
+		#Drop connections the database closed while we slept.
+		close_old_connections()
+		try:
+			if leader.acquireLock(LOCK_NAME, owner, options["ttl"]):
+				closed = closeExpiredItems()
+				if closed:
+					logger.info("%s closed %d auctions", owner, closed)
+				if options["verbosity"] > 1:
+					self.stdout.write("%s is leader, closed %d auctions" % (owner, closed))
+		except DatabaseError:
+			#Keep the worker alive; the next pass retries.
+			logger.exception("%s expiry pass failed", owner)
+		finally:
+			close_old_connections()
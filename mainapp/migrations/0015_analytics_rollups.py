@@ -0,0 +1,52 @@
+# Generated by Django 2.2.5 on 2026-10-19 14:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('mainapp', '0014_auto_20191114_0756'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlyBidStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(unique=True)),
+                ('bids', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ItemOutcome',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('closedAt', models.DateTimeField(db_index=True)),
+                ('sold', models.BooleanField(default=False)),
+                ('finalPrice', models.DecimalField(decimal_places=2, max_digits=9, null=True)),
+                ('bidCount', models.IntegerField(default=0)),
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='mainapp.Item')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='itemoutcomes', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SellerDailyStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('itemsListed', models.IntegerField(default=0)),
+                ('bids', models.IntegerField(default=0)),
+                ('itemsClosed', models.IntegerField(default=0)),
+                ('itemsSold', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dailystats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('seller', 'day')},
+            },
+        ),
+    ]
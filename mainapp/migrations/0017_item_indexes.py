@@ -0,0 +1,23 @@
+# Generated by Django 2.2.5 on 2026-10-19 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0016_workerlock'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='item',
+            name='expiredate',
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='item',
+            name='status',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.5 on 2026-10-19 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0018_customerprofile_userid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemoutcome',
+            name='cancelled',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -11,13 +11,48 @@ class Item(models.Model):
 	seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='seller')
 	title = models.CharField(max_length=1000)
 	description = models.CharField(max_length=9999)
-	expiredate =  models.DateTimeField()
+	expiredate =  models.DateTimeField(db_index=True)
 	imagename = models.CharField(max_length=1000)
 	imageurl = models.CharField(max_length=1000)
 	bidders = models.CharField(max_length=9999, default="")
 	price = models.DecimalField(max_digits=9, decimal_places=2, null=True)
-	status = models.BooleanField(default=False)
+	status = models.BooleanField(default=False, db_index=True)
 	buyer = models.ForeignKey(User, on_delete=models.PROTECT, related_name='buyer')
 
 	def __str__ (self):
 		return self.title
+
+class SellerDailyStats(models.Model):
+	"""Per seller, per day rollup maintained by mainapp.analytics."""
+	seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='dailystats')
+	day = models.DateField()
+	itemsListed = models.IntegerField(default=0)
+	bids = models.IntegerField(default=0)
+	itemsClosed = models.IntegerField(default=0)
+	itemsSold = models.IntegerField(default=0)
+	revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+	class Meta:
+		unique_together = ('seller', 'day')
+
+class HourlyBidStats(models.Model):
+	"""Marketplace wide bid count per hour, maintained by mainapp.analytics."""
+	hour = models.DateTimeField(unique=True)
+	bids = models.IntegerField(default=0)
+
+class ItemOutcome(models.Model):
+	"""Final outcome of a closed auction, written once by the close path."""
+	item = models.OneToOneField(Item, on_delete=models.CASCADE)
+	seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='itemoutcomes')
+	closedAt = models.DateTimeField(db_index=True)
+	sold = models.BooleanField(default=False)
+	finalPrice = models.DecimalField(max_digits=9, decimal_places=2, null=True)
+	bidCount = models.IntegerField(default=0)
+	#Cancelled by an operator: kept out of the seller rollups.
+	cancelled = models.BooleanField(default=False)
+
+class WorkerLock(models.Model):
+	"""Lease row used for leader election between nodes, see mainapp.leader."""
+	name = models.CharField(max_length=100, unique=True)
+	owner = models.CharField(max_length=255)
+	expiresAt = models.DateTimeField()
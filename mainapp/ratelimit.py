@@ -0,0 +1,134 @@
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+REJECTED_KEY = "rl:rejected:%s"
+
+def getClientIp(request):
+	"""
+	Client address. Behind RATELIMIT_TRUSTED_PROXIES proxies it is the entry that many
+	hops from the right of X-Forwarded-For: everything left of it is client supplied.
+	"""
+	proxies = getattr(settings, 'RATELIMIT_TRUSTED_PROXIES', 0)
+	if proxies:
+		forwarded = [entry.strip() for entry in request.META.get('HTTP_X_FORWARDED_FOR', '').split(",") if entry.strip()]
+		if len(forwarded) >= proxies:
+			return forwarded[-proxies]
+	return request.META.get('REMOTE_ADDR', '')
+
+def getIdentities(request, policy):
+	"""
+	Every request is counted against its IP; authenticated requests are also counted
+	against the account. Returns (identity, rate) pairs, 'ipRate' defaulting to 'rate'.
+	"""
+	identities = [("ip" + getClientIp(request), policy.get('ipRate', policy['rate']))]
+	user = getattr(request, 'user', None)
+	if user is not None and user.is_authenticated:
+		identities.append(("u" + str(user.pk), policy['rate']))
+	return identities
+
+def policyApplies(policy, request):
+	if request.method not in policy.get('methods', ('GET', 'POST', 'PUT', 'DELETE')):
+		return False
+	params = policy.get('params')
+	if params:
+		return any(p in request.GET for p in params)
+	return True
+
+def waitTime(current, previous, rate, period, elapsed):
+	"""Seconds until a request is allowed again, 0 if it is allowed now."""
+	if previous * (period - elapsed) / period + current < rate:
+		return 0
+	if current >= rate or previous == 0:
+		return max(1, int(math.ceil(period - elapsed)))
+	# Time until the previous window has decayed enough to let one more through.
+	wait = period - elapsed - (rate - current) * period / previous
+	return max(1, int(math.floor(wait)) + 1)
+
+def hit(cache, name, identities, period, now=None):
+	"""
+	Sliding window counter: the previous fixed window is weighted by how much of it
+	still overlaps the sliding window. identities is a list of (identity, rate) pairs;
+	the request is rejected if any of them is over its rate.
+
+	Each counter is incremented first and the decision made on the value the cache
+	returns, so concurrent requests cannot all pass on the same stale count. A rejected
+	request is taken back off again. Costs one get_many and one add/incr per identity.
+	Returns 0 if the request is allowed, otherwise the seconds until it would be.
+	"""
+	if now is None:
+		now = time.time()
+	window = int(now // period)
+	elapsed = now - window * period
+	keys = [("rl:%s:%s:%d" % (name, identity, window), "rl:%s:%s:%d" % (name, identity, window - 1), rate) for identity, rate in identities]
+	previous = cache.get_many([previousKey for currentKey, previousKey, rate in keys])
+
+	wait = 0
+	for currentKey, previousKey, rate in keys:
+		count = increment(cache, currentKey, period * 2)
+		wait = max(wait, waitTime(count - 1, previous.get(previousKey, 0), rate, period, elapsed))
+	if wait:
+		for currentKey, previousKey, rate in keys:
+			try:
+				cache.decr(currentKey)
+			except ValueError:
+				pass
+	return wait
+
+def increment(cache, key, timeout):
+	"""add/incr a counter, returning its new value."""
+	if cache.add(key, 1, timeout):
+		return 1
+	try:
+		return cache.incr(key)
+	except ValueError:
+		# Expired between add() and incr().
+		cache.set(key, 1, timeout)
+		return 1
+
+def rejectedCount(name):
+	"""Number of requests rejected under the given policy, for monitoring."""
+	cache = caches[getattr(settings, 'RATELIMIT_CACHE', 'default')]
+	return cache.get(REJECTED_KEY % name, 0)
+
+class RateLimitMiddleware:
+	"""
+	Applies the per-route policies in settings.RATELIMIT_POLICIES, keyed by the
+	namespaced URL name (e.g. 'mainapp:itempage'). Must come after
+	AuthenticationMiddleware so request.user is available.
+	"""
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+
+	def __call__(self, request):
+		return self.get_response(request)
+
+	def process_view(self, request, view_func, view_args, view_kwargs):
+		if not getattr(settings, 'RATELIMIT_ENABLED', True):
+			return None
+		match = request.resolver_match
+		policy = getattr(settings, 'RATELIMIT_POLICIES', {}).get(match.view_name) if match else None
+		if not policy or not policyApplies(policy, request):
+			return None
+
+		cache = caches[getattr(settings, 'RATELIMIT_CACHE', 'default')]
+		identities = getIdentities(request, policy)
+		retryAfter = hit(cache, match.view_name, identities, policy['period'])
+		if not retryAfter:
+			return None
+
+		increment(cache, REJECTED_KEY % match.view_name, None)
+		#Log once per client and window; the rejected counter covers the rest.
+		who = "+".join(identity for identity, rate in identities)
+		if cache.add("rl:logged:%s:%s:%d" % (match.view_name, who, time.time() // policy['period']), 1, policy['period']):
+			logger.warning("Rate limit exceeded for %s by %s", match.view_name, who)
+		response = HttpResponse("Too many requests, please try again later.", status=429)
+		response['Retry-After'] = str(retryAfter)
+		return response
@@ -0,0 +1,314 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from . import analytics, leader, ratelimit
+from .expiry import closeExpiredItems
+from .models import HourlyBidStats, Item, ItemOutcome, SellerDailyStats, WorkerLock
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ratelimit-tests'}}
+
+@override_settings(CACHES=LOCMEM)
+class RateLimitHitTests(SimpleTestCase):
+
+	def setUp(self):
+		self.cache = caches['default']
+		self.cache.clear()
+
+	def hit(self, now, identities=(("ip1", 3),)):
+		return ratelimit.hit(self.cache, "test", list(identities), 60, now=now)
+
+	def test_allows_until_rate_then_rejects(self):
+		self.assertEqual([self.hit(600 + i) for i in range(3)], [0, 0, 0])
+		self.assertEqual(self.hit(603), 57)
+
+	def test_rejected_requests_are_not_counted(self):
+		for i in range(3):
+			self.hit(600)
+		self.hit(601)
+		self.assertEqual(self.cache.get("rl:test:ip1:10"), 3)
+
+	def test_previous_window_decays(self):
+		for i in range(3):
+			self.hit(600)
+		# At the start of the next window the previous one still weighs in fully.
+		self.assertEqual(self.hit(660), 1)
+		self.assertEqual(self.hit(675), 0)
+		# 16s in: 3 * 44/60 + 1 is still over the rate, until 3 * 39/60 + 1 at 21s.
+		self.assertEqual(self.hit(676), 5)
+		self.assertEqual(self.hit(680), 1)
+		self.assertEqual(self.hit(681), 0)
+
+	def test_wait_time(self):
+		self.assertEqual(ratelimit.waitTime(0, 0, 3, 60, 10), 0)
+		self.assertEqual(ratelimit.waitTime(3, 0, 3, 60, 10), 50)
+		self.assertEqual(ratelimit.waitTime(1, 4, 3, 60, 15), 16)
+
+	def test_rejects_if_any_identity_is_over(self):
+		for i in range(3):
+			self.hit(600, (("ip1", 5), ("u1", 3)))
+		self.assertEqual(self.hit(601, (("ip1", 5), ("u2", 3))), 0)
+		self.assertNotEqual(self.hit(602, (("ip1", 5), ("u1", 3))), 0)
+		self.assertEqual(self.hit(602, (("ip1", 5), ("u3", 3))), 0)
+		self.assertNotEqual(self.hit(603, (("ip1", 5), ("u4", 3))), 0)
+
+	def test_concurrent_requests_cannot_exceed_rate(self):
+		results = []
+		def worker():
+			results.append(self.hit(600, (("ip1", 5),)))
+		threads = [threading.Thread(target=worker) for i in range(20)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		self.assertEqual(results.count(0), 5)
+		self.assertEqual(self.cache.get("rl:test:ip1:10"), 5)
+
+class RateLimitPolicyTests(SimpleTestCase):
+
+	def test_methods(self):
+		request = RequestFactory().put('/itempage.html/')
+		self.assertTrue(ratelimit.policyApplies({'methods': ['PUT']}, request))
+		self.assertFalse(ratelimit.policyApplies({'methods': ['POST']}, request))
+
+	@override_settings(RATELIMIT_TRUSTED_PROXIES=0)
+	def test_client_ip_ignores_forwarded_for_without_proxies(self):
+		request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='1.1.1.1', REMOTE_ADDR='10.0.0.1')
+		self.assertEqual(ratelimit.getClientIp(request), '10.0.0.1')
+
+	@override_settings(RATELIMIT_TRUSTED_PROXIES=1)
+	def test_client_ip_ignores_spoofed_forwarded_for(self):
+		honest = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='203.0.113.9', REMOTE_ADDR='10.0.0.1')
+		spoofed = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='1.1.1.1, 203.0.113.9', REMOTE_ADDR='10.0.0.1')
+		self.assertEqual(ratelimit.getClientIp(honest), '203.0.113.9')
+		self.assertEqual(ratelimit.getClientIp(spoofed), '203.0.113.9')
+
+	@override_settings(RATELIMIT_TRUSTED_PROXIES=2)
+	def test_client_ip_behind_two_proxies(self):
+		request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='1.1.1.1, 203.0.113.9, 10.0.0.2', REMOTE_ADDR='10.0.0.1')
+		self.assertEqual(ratelimit.getClientIp(request), '203.0.113.9')
+
+	def test_params(self):
+		policy = {'methods': ['GET'], 'params': ['searchvalue']}
+		self.assertTrue(ratelimit.policyApplies(policy, RequestFactory().get('/', {'searchvalue': 'x'})))
+		self.assertFalse(ratelimit.policyApplies(policy, RequestFactory().get('/')))
+
+@override_settings(CACHES=LOCMEM, RATELIMIT_POLICIES={'mainapp:index': {'methods': ['GET'], 'params': ['searchvalue'], 'rate': 2, 'period': 60}})
+class RateLimitMiddlewareTests(TestCase):
+
+	def setUp(self):
+		caches['default'].clear()
+
+	def test_returns_429_and_counts_rejections(self):
+		self.assertEqual([self.client.get('/', {'searchvalue': 'x'}).status_code for i in range(2)], [200, 200])
+		with self.assertLogs('mainapp.ratelimit', 'WARNING') as logs, self.assertLogs('django.request', 'WARNING'):
+			response = self.client.get('/', {'searchvalue': 'x'})
+			self.client.get('/', {'searchvalue': 'x'})
+		self.assertEqual(response.status_code, 429)
+		self.assertTrue(int(response['Retry-After']) >= 1)
+		self.assertEqual(ratelimit.rejectedCount('mainapp:index'), 2)
+		#Logged once per client and window, not per rejection.
+		self.assertEqual(len(logs.output), 1)
+		self.assertEqual(self.client.get('/').status_code, 200)
+
+	def test_users_share_their_ip_limit(self):
+		for name in ("a", "b"):
+			self.client.force_login(User.objects.create_user(name, password="p"))
+			self.client.get('/', {'searchvalue': 'x'})
+		self.client.force_login(User.objects.create_user("c", password="p"))
+		with self.assertLogs('mainapp.ratelimit', 'WARNING'), self.assertLogs('django.request', 'WARNING'):
+			self.assertEqual(self.client.get('/', {'searchvalue': 'x'}).status_code, 429)
+
+class AnalyticsTests(TestCase):
+
+	def setUp(self):
+		self.seller = User.objects.create_user("seller", password="p")
+		self.bidder = User.objects.create_user("bidder", password="p")
+
+	def createItem(self, expiredate, **fields):
+		return Item.objects.create(seller=self.seller, buyer=fields.pop("buyer", self.seller), title="t", description="d", expiredate=expiredate, imagename="", imageurl="", price=Decimal("5.00"), **fields)
+
+	def bid(self, item, value):
+		return self.client.put('/itempage.html/', 'userbidvalue=%s&pkvalue=%d' % (value, item.pk))
+
+	def test_bid_is_recorded(self):
+		item = self.createItem(timezone.now() + timedelta(days=1))
+		self.client.force_login(self.bidder)
+		self.assertEqual(self.bid(item, 7).json()["items"]["newprice"], 7.0)
+		self.assertEqual(SellerDailyStats.objects.get(seller=self.seller).bids, 1)
+		self.assertEqual(HourlyBidStats.objects.get().bids, 1)
+
+	def test_bid_on_closed_item_is_rejected(self):
+		item = self.createItem(timezone.now() - timedelta(minutes=1))
+		self.client.force_login(self.bidder)
+		self.assertEqual(self.bid(item, 7).content, b"This auction has closed!")
+		item.refresh_from_db()
+		self.assertEqual(item.price, Decimal("5.00"))
+		self.assertFalse(SellerDailyStats.objects.exists())
+
+	def test_close_records_outcome_once(self):
+		item = self.createItem(timezone.now() - timedelta(minutes=1), buyer=self.bidder, bidders="bidder 5.0,")
+		self.assertEqual(closeExpiredItems(), 1)
+		self.assertEqual(closeExpiredItems(), 0)
+		self.assertEqual(analytics.recordClose(Item.objects.get(pk=item.pk)), 0)
+		outcome = ItemOutcome.objects.get()
+		self.assertTrue(outcome.sold)
+		self.assertEqual(outcome.bidCount, 1)
+		summary = analytics.sellerSummary(self.seller)
+		self.assertEqual((summary["itemsClosed"], summary["itemsSold"], summary["revenue"]), (1, 1, Decimal("5.00")))
+
+	def test_rebuild_outcomes(self):
+		for i in range(3):
+			self.createItem(timezone.now() - timedelta(days=1), status=True)
+		self.assertEqual(analytics.rebuildOutcomes(), 3)
+		self.assertEqual(analytics.rebuildOutcomes(), 0)
+		self.assertEqual(SellerDailyStats.objects.get().itemsClosed, 3)
+
+class LeaderTests(TestCase):
+
+	def test_first_take(self):
+		self.assertTrue(leader.acquireLock("job", "a", 60))
+		self.assertEqual(WorkerLock.objects.get(name="job").owner, "a")
+
+	def test_renewal(self):
+		leader.acquireLock("job", "a", 60)
+		before = WorkerLock.objects.get(name="job").expiresAt
+		self.assertTrue(leader.acquireLock("job", "a", 120))
+		self.assertGreater(WorkerLock.objects.get(name="job").expiresAt, before)
+
+	def test_refused_while_lease_is_live(self):
+		leader.acquireLock("job", "a", 60)
+		self.assertFalse(leader.acquireLock("job", "b", 60))
+		self.assertEqual(WorkerLock.objects.get(name="job").owner, "a")
+
+	def test_takeover_after_expiry(self):
+		leader.acquireLock("job", "a", 60)
+		WorkerLock.objects.filter(name="job").update(expiresAt=timezone.now() - timedelta(seconds=1))
+		self.assertTrue(leader.acquireLock("job", "b", 60))
+		self.assertFalse(leader.acquireLock("job", "a", 60))
+
+	def test_release(self):
+		leader.acquireLock("job", "a", 60)
+		leader.releaseLock("job", "b")
+		self.assertFalse(leader.acquireLock("job", "b", 60))
+		leader.releaseLock("job", "a")
+		self.assertTrue(leader.acquireLock("job", "b", 60))
+
+class MultiNodeSettingsTests(SimpleTestCase):
+	"""Settings are evaluated at import, so each case runs `manage.py check` in a fresh process."""
+
+	def check(self, **env):
+		inherited = {name: value for name, value in os.environ.items() if not name.startswith(("DJANGO_", "AUCTION_"))}
+		return subprocess.run([sys.executable, os.path.join(settings.BASE_DIR, "manage.py"), "check"], env=dict(inherited, AUCTION_MULTI_NODE="1", DJANGO_SETTINGS_MODULE="auctionapp.settings", **env), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True).stdout
+
+	def test_rejects_node_local_caches(self):
+		for backend in ("locmem.LocMemCache", "filebased.FileBasedCache", "dummy.DummyCache"):
+			output = self.check(DJANGO_CACHE_BACKEND="django.core.cache.backends." + backend, DJANGO_CACHE_LOCATION="/tmp/auction-cache", AUCTION_SHARED_MEDIA_ROOT="1")
+			self.assertIn("needs a shared cache", output)
+
+	def test_filesystem_storage_needs_shared_media_root(self):
+		shared = {"DJANGO_CACHE_BACKEND": "django.core.cache.backends.db.DatabaseCache", "DJANGO_CACHE_LOCATION": "auction_cache"}
+		self.assertIn("needs shared media storage", self.check(**shared))
+		self.assertIn("no issues", self.check(AUCTION_SHARED_MEDIA_ROOT="1", **shared))
+
+class ExpiryWorkerProcessTests(SimpleTestCase):
+	"""Runs several expiry workers as separate processes against one shared database file."""
+	WORKERS = 4
+	ITEMS = 25
+
+	SEED = """
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.utils import timezone
+from mainapp.models import Item
+seller = User.objects.create_user("seller", password="p")
+buyer = User.objects.create_user("buyer", password="p")
+for i in range(%d):
+	Item.objects.create(seller=seller, buyer=buyer if i %% 2 else seller, title="t", description="d", expiredate=timezone.now() - timedelta(minutes=1), imagename="", imageurl="", price=i + 1, bidders="buyer 1.0," if i %% 2 else "")
+"""
+
+	REPORT = """
+import json
+from mainapp.models import Item, ItemOutcome, SellerDailyStats, WorkerLock
+print(json.dumps({"open": Item.objects.filter(status=False).count(), "outcomes": ItemOutcome.objects.count(), "outcomeItems": ItemOutcome.objects.values("item").distinct().count(), "closedTotal": sum(SellerDailyStats.objects.values_list("itemsClosed", flat=True)), "locks": WorkerLock.objects.count()}))
+"""
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.env = dict(os.environ, DATABASE_NAME=os.path.join(self.directory, "db.sqlite3"), DJANGO_SETTINGS_MODULE="auctionapp.settings")
+		self.env.pop("AUCTION_MULTI_NODE", None)
+		self.manage("migrate", "-v", "0")
+		self.manage("shell", "-c", self.SEED % self.ITEMS)
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def manage(self, *args):
+		return subprocess.run([sys.executable, os.path.join(settings.BASE_DIR, "manage.py")] + list(args), env=self.env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True, check=True).stdout
+
+	def test_one_leader_closes_each_item_once(self):
+		command = [sys.executable, os.path.join(settings.BASE_DIR, "manage.py"), "run_expiry_worker", "--once", "-v", "2"]
+		workers = [subprocess.Popen(command, env=self.env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True) for i in range(self.WORKERS)]
+		outputs = [worker.communicate(timeout=60)[0] for worker in workers]
+		self.assertEqual([worker.returncode for worker in workers], [0] * self.WORKERS, outputs)
+
+		leaders = [output for output in outputs if "is leader" in output]
+		self.assertEqual(len(leaders), 1, outputs)
+		self.assertIn("closed %d auctions" % self.ITEMS, leaders[0])
+
+		report = json.loads(self.manage("shell", "-c", self.REPORT))
+		self.assertEqual(report, {"open": 0, "outcomes": self.ITEMS, "outcomeItems": self.ITEMS, "closedTotal": self.ITEMS, "locks": 1})
+
+class ItemAdminTests(TestCase):
+
+	def setUp(self):
+		self.admin = User.objects.create_superuser("admin", "admin@example.com", "p")
+		self.bidder = User.objects.create_user("bidder", password="p")
+		self.client.force_login(self.admin)
+
+	def createItems(self, count, **fields):
+		fields.setdefault("expiredate", timezone.now() + timedelta(days=1))
+		return [Item.objects.create(seller=self.admin, buyer=self.admin, title="t", description="d", imagename="", imageurl="", price=1, **fields) for i in range(count)]
+
+	def act(self, action, items):
+		return self.client.post('/admin/mainapp/item/', {'action': action, '_selected_action': [item.pk for item in items]})
+
+	def test_close_only_records_selected_items(self):
+		self.createItems(20, status=True, expiredate=timezone.now() - timedelta(days=1))
+		selected = self.createItems(2)
+		self.act('closeItems', selected)
+		self.assertEqual(set(ItemOutcome.objects.values_list("item_id", flat=True)), {item.pk for item in selected})
+		self.assertEqual(SellerDailyStats.objects.get().itemsClosed, 2)
+
+	def test_cancel_closes_without_winner(self):
+		item = Item.objects.create(seller=self.admin, buyer=self.bidder, title="t", description="d", expiredate=timezone.now() + timedelta(days=1), imagename="", imageurl="", price=3)
+		self.act('cancelItems', [item])
+		item.refresh_from_db()
+		self.assertTrue(item.status)
+		self.assertEqual(item.buyer, self.admin)
+		outcome = ItemOutcome.objects.get()
+		self.assertTrue(outcome.cancelled)
+		self.assertFalse(outcome.sold)
+		self.assertFalse(SellerDailyStats.objects.exists())
+		self.assertEqual(analytics.rebuildOutcomes(), 0)
+
+	def test_extend(self):
+		item = self.createItems(1)[0]
+		self.act('extendItems', [item])
+		self.assertEqual(Item.objects.get(pk=item.pk).expiredate, item.expiredate + timedelta(days=1))
+
+	def test_rollups_are_read_only(self):
+		self.assertEqual(self.client.get('/admin/mainapp/itemoutcome/').status_code, 200)
+		self.assertEqual(self.client.get('/admin/mainapp/sellerdailystats/add/').status_code, 403)
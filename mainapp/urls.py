@@ -15,6 +15,8 @@ urlpatterns = [
 	path('update_profile/', views.update_profile, name='update_profile'),
 	path('itempage.html/', views.itempage, name='itempage'),
 	path('user_biddings/', views.user_biddings, name='user_biddings'),
+	path('seller_dashboard/', views.seller_dashboard, name='seller_dashboard'),
+	path('seller_dashboard/csv/', views.seller_dashboard_csv, name='seller_dashboard_csv'),
 ]
 
 #Should not have during production.
@@ -7,21 +7,23 @@ from django.http import HttpResponse, Http404, QueryDict, JsonResponse
 from django.contrib.auth.models import User
 from django.contrib.auth import logout, authenticate, login as auth_login
 #from django.urls import reverse
-import re, time
+import re, time, csv
 from .models import CustomerProfile, Item
+from . import analytics
+from .expiry import closeExpiredItems
+from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 #from django.views.generic import TemplateView
-from django.core.files.storage import FileSystemStorage
-from datetime import datetime
+from django.core.files.storage import default_storage
+from datetime import datetime, timedelta
 #from django.core.mail import send_mail
 #from djutils.decorators import async
 
 # Create your views here.
 def checkExpire():
-	u = Item.objects.all()
-	for i in u:
-		if(timezone.now()>i.expiredate):
-			Item.objects.filter(id=i.pk).update(status=True)
+	#In multi-node mode the run_expiry_worker command closes auctions instead.
+	if settings.AUCTION_EXPIRY_IN_REQUEST:
+		closeExpiredItems()
 
 def index(request):
 	checkExpire()
@@ -101,10 +103,10 @@ def new_item(request):
 			expiredate = expiredate[0]+":"+expiredate[1]
 			expiredate = datetime.strptime(expiredate, "%Y-%m-%d %H:%M")
 			document = request.FILES["document"]
-			fs = FileSystemStorage()
-			imagename = fs.save(document.name, document)
-			imageurl = fs.url(imagename)
-			Item.objects.create(seller=seller, title=title, description=description, expiredate=expiredate, imagename=imagename, imageurl=imageurl, price=price, buyer=seller, status=False)
+			imagename = default_storage.save(document.name, document)
+			imageurl = default_storage.url(imagename)
+			item = Item.objects.create(seller=seller, title=title, description=description, expiredate=expiredate, imagename=imagename, imageurl=imageurl, price=price, buyer=seller, status=False)
+			analytics.recordListing(item)
 			print("New Item Created")
 	except:
 		pass
@@ -160,6 +162,8 @@ def itempage(request):
 		itempkvalue = put.get('pkvalue')
 		itemobject = Item.objects.get(pk=int(itempkvalue))
 
+		if(itemobject.status or itemobject.expiredate <= timezone.now()):
+			return HttpResponse("This auction has closed!")
 		if(userbidvalue>itemobject.price):
 			user_pk = request.user
 			#New bidder
@@ -167,7 +171,11 @@ def itempage(request):
 			newbidlist = newbidlist.replace('"','').replace("'","")
 			#Update buyer
 			buyer = User.objects.get(pk=user_pk.pk)
-			Item.objects.filter(pk=int(itempkvalue)).update(bidders=newbidlist,price=userbidvalue,buyer=buyer)
+			#Only applies if the auction is still open and nobody else bid since we read it.
+			updated = Item.objects.filter(pk=int(itempkvalue), status=False, expiredate__gt=timezone.now(), price=itemobject.price).update(bidders=newbidlist,price=userbidvalue,buyer=buyer)
+			if(not updated):
+				return HttpResponse("This auction has changed, please refresh and try again!")
+			analytics.recordBid(itemobject)
 			return JsonResponse({"items": {"newprice": userbidvalue, "bidderid": user_pk.username}})
 		else:
 			return HttpResponse("Your bidding value is too small!")
@@ -184,4 +192,23 @@ def itempage(request):
 
 def user_biddings(request):
 	user_pk = request.user.username
-	return render(request,'mainapp/userbiddings.html', {"items": Item.objects.filter(bidders__icontains=user_pk), "username": user_pk})
\ No newline at end of file
+	return render(request,'mainapp/userbiddings.html', {"items": Item.objects.filter(bidders__icontains=user_pk), "username": user_pk})
+
+def seller_dashboard(request):
+	user_pk = request.user.pk
+	if(not user_pk):
+		return redirect('mainapp:login')
+	context = {"summary": analytics.sellerSummary(request.user), "days": analytics.sellerDailyRows(request.user)[:30], "hours": analytics.bidsPerHour(timezone.now() - timedelta(hours=24))}
+	return render(request,'mainapp/sellerdashboard.html', context)
+
+def seller_dashboard_csv(request):
+	user_pk = request.user.pk
+	if(not user_pk):
+		return redirect('mainapp:login')
+	response = HttpResponse(content_type="text/csv")
+	response["Content-Disposition"] = 'attachment; filename="seller_stats.csv"'
+	writer = csv.writer(response)
+	writer.writerow(["day", "items_listed", "bids", "items_closed", "items_sold", "revenue"])
+	for row in analytics.sellerDailyRows(request.user).values_list("day", "itemsListed", "bids", "itemsClosed", "itemsSold", "revenue").iterator():
+		writer.writerow(row)
+	return response